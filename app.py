@@ -1,10 +1,8 @@
 import streamlit as st
-import os
 import uuid
 import logging
-import subprocess
 
-from utils import classify_and_respond, get_version_info, MOOD_CHOICES
+from utils import classify_and_respond, get_api_key, get_version_info, MOOD_CHOICES
 
 logging.basicConfig(level=logging.INFO)
 
@@ -12,65 +10,71 @@ logging.basicConfig(level=logging.INFO)
 st.set_page_config(page_title="Bluum Journal", page_icon="🌸", layout="centered")
 st.title("🌸 Bluum Journal")
 
-# --- Reset Session State ---
-if "reset" in st.session_state and st.session_state.reset:
-    for key in ["entry", "response", "prompts", "conversation", "submitted"]:
-        st.session_state.pop(key, None)
-    st.session_state.reset = False
-    st.session_state.mood = "OK"
-    st.rerun() # Reset the session state if requested
-
 # --- Session State Initialization ---
 
 if 'session_id' not in st.session_state:
     st.session_state.session_id = str(uuid.uuid4())
 
-if "conversation" not in st.session_state:
-    st.session_state.conversation = {}
-
-if "prompts" not in st.session_state:
-    st.session_state.prompts = []
-
-if "response" not in st.session_state:
-    st.session_state.response = None
+def session_defaults():
+    # Built fresh on each call so sessions never share the mutable containers
+    return {
+        "conversation": {},
+        "prompts": [],
+        "response": None,
+        "submitted": False,
+        "entry": "",
+        "mood": "OK",
+    }
 
-if "submitted" not in st.session_state:
-    st.session_state.submitted = False
-
-if "entry" not in st.session_state:
-    st.session_state.entry = ""
-
-if "mood" not in st.session_state:
-    st.session_state.mood = "OK"
+for key, value in session_defaults().items():
+    st.session_state.setdefault(key, value)
 
 def smile_response_callback():
-    st.session_state.prompts.append(current_prompt.strip())
-    prompt_index = len(st.session_state.prompts) - 1
-    st.session_state.conversation[prompt_index] = st.session_state.entry.strip()
+    prompt = current_prompt.strip()
+    entry = st.session_state.entry.strip()
+    # Resubmitting the same reflection shouldn't grow the history sent to the AI
+    prompts = st.session_state.prompts
+    if prompts and prompts[-1] == prompt and st.session_state.conversation[len(prompts) - 1] == entry:
+        return
+    prompts.append(prompt)
+    prompt_index = len(prompts) - 1
+    st.session_state.conversation[prompt_index] = entry
+
+def start_over_callback():
+    # Runs before the next rerun, so widget keys can be reset here without an extra st.rerun()
+    st.session_state.update(session_defaults())
 
 # --- Mood selection
-mood_choice = st.select_slider(
-    "How do you feel today?",
-    options=MOOD_CHOICES, key="mood",
-)
-st.write("Your're feeling... ", mood_choice)
+# A fragment, so moving the slider only reruns this block instead of the whole page
+@st.fragment
+def mood_selector():
+    mood_choice = st.select_slider(
+        "How do you feel today?",
+        options=MOOD_CHOICES, key="mood",
+    )
+    st.write("Your're feeling... ", mood_choice)
+
+mood_selector()
 
 # --- Prompt of the Day ---
 current_prompt = "What made you smile today?"
 st.markdown(f"#### {current_prompt}")
 
-# --- Text Area Input ---
-st.text_area("Your response:", key="entry", height=150, on_change=smile_response_callback)
+# --- Journal Entry Form ---
+# Edits inside the form don't rerun the script; the entry is only recorded on Submit
+with st.form("entry_form"):
+    st.text_area("Your response:", key="entry", height=150)
+    submitted = st.form_submit_button("Submit", on_click=smile_response_callback)
 
 # --- API Key ---
-api_key = st.secrets.get("OPENROUTER_API_KEY") or os.getenv("OPENROUTER_API_KEY")
+api_key = get_api_key()
 if not api_key:
     st.warning("Missing API Key. Set OPENROUTER_API_KEY in your environment or Streamlit secrets.")
 
 # --- Submit Logic ---
-if st.button("Submit"):
+if submitted:
     st.session_state.submitted = True
-    st.session_state.response = classify_and_respond(api_key, st.session_state.session_id, st.session_state.prompts, st.session_state.conversation, mood_choice)
+    st.session_state.response = classify_and_respond(api_key, st.session_state.session_id, st.session_state.prompts, st.session_state.conversation, st.session_state.mood)
 
 # --- Display Response ---
 if st.session_state.submitted and st.session_state.response:
@@ -87,9 +91,7 @@ if st.session_state.submitted and st.session_state.response:
         st.success(response_text)
 
 # --- Start Over Button ---
-if st.button("Start Over"):
-    st.session_state.reset = True
-    st.rerun()  # Reset the session state and rerun the app
+st.button("Start Over", on_click=start_over_callback)
 
 # Print versions info at the bottom for reference
 get_version_info(st.session_state.session_id)
\ No newline at end of file